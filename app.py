@@ -1,15 +1,38 @@
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg') # 화면 출력 없이 PNG로만 렌더링하므로 가장 빠른 래스터 백엔드 사용
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 import streamlit as st
 import numpy as np
 import io
-import re
+import os
+import hashlib
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pac
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 미설치 시 pandas C 엔진으로 대체 (Parquet 캐시는 사용 안 함)
+    pa = None
+    pac = None
+    pc = None
+    pq = None
 
 # --- 설정값 (CAN 데이터 변환 상수) ---
 TARGET_CAN_ID = '295'      
 START_BYTE_INDEX = 1       
 MAX_PHYSICAL_PRESSURE = 200.0 
 PHYSICAL_FACTOR = MAX_PHYSICAL_PRESSURE / 255.0 
+# 원시 바이트값(0-255) -> 압력(bar) 변환표 (행마다 곱셈 대신 인덱싱 한 번으로 변환)
+PRESSURE_LUT = np.arange(256, dtype=np.float32) * np.float32(PHYSICAL_FACTOR)
 
 # 🚨 [수정] 그래프 Y축 최대 범위만 250.0 bar로 변경
 MAX_PLOT_Y_BAR = 250.0     
@@ -19,107 +42,505 @@ COLUMNS = ['Bus', 'No', 'Time', 'State', 'ID (hex)', 'DLC', 'Data (hex)', 'ASCII
 TIME_COLUMN = 'Time'
 CAN_ID_COLUMN = 'ID (hex)'
 DATA_COLUMN = 'Data (hex)' 
+USE_COLUMNS = [TIME_COLUMN, CAN_ID_COLUMN, DATA_COLUMN] # 파싱 단계에서 나머지 컬럼은 버림
+# CAN ID는 버스마다 정해진 소수(수십 개)의 값만 나타나므로 범주형(사전 인코딩)으로 읽음
+COLUMN_DTYPES = {TIME_COLUMN: 'string', CAN_ID_COLUMN: 'category', DATA_COLUMN: 'string'}
+# [[시:]분:]초.ms 형식의 Time 값 (시/분은 생략 가능, 한 시간을 넘기면 MM:SS -> H:MM:SS)
+TIME_PATTERN = r'^\s*(?:(?:(?P<hours>\d+):)?(?P<minutes>\d+):)?(?P<seconds>\d+(?:\.\d*)?)\s*$'
+
+DELIMITER_CANDIDATES = [',', '\t', ';', ' '] # 구분자 후보 (우선순위 순)
+SNIFF_SAMPLE_SIZE = 8192                      # 구분자 판별에 사용할 앞부분 길이 (bytes)
+
+# 처리 결과(t, p)를 파일 내용 해시별 Parquet으로 보관 (CAN_CACHE_DIR 환경변수로 위치 변경 가능)
+PARQUET_CACHE_DIR = Path(os.environ.get('CAN_CACHE_DIR', Path(__file__).resolve().parent / '.can_cache'))
+PARQUET_CACHE_MAX_FILES = 64                  # 최근 사용 순으로 이 개수까지만 보관
+PARQUET_CACHE_MAX_AGE_DAYS = 30               # 이 기간 동안 사용되지 않은 캐시는 삭제
+CACHE_FORMAT_VERSION = 2                      # 파싱/변환 설정값은 캐시 키에 포함되므로, 시간/페이로드 변환 코드를 바꿀 때만 올림
 
 GRAPH_COLORS = ['r', 'b', 'g'] # 빨간색, 파란색, 초록색
 LINE_WIDTH = 1.0               # 얇은 두께
+MAX_PLOT_POINTS = 2000         # 그래프 하나에 그릴 최대 점 개수 (화면 해상도 기준)
+
+# matplotlib 경로 단순화 (시각적으로 구분되지 않는 점은 그리기 단계에서 생략)
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+plt.rcParams['agg.path.chunksize'] = 10000
+
+# 1~2자리 16진수 바이트 문자열 -> 값 변환표 (대소문자 무관, 'F'는 '0F'와 같음)
+HEX_DIGITS = '0123456789abcdefABCDEF'
+HEX_BYTE_VALUES = {high + low: int(high + low, 16) for high in ['', *HEX_DIGITS] for low in HEX_DIGITS}
+HEX_BYTE_TOKENS = list(HEX_BYTE_VALUES)
+HEX_BYTE_LUT = np.array(list(HEX_BYTE_VALUES.values()), dtype=np.uint8)
 
 # --- 함수 정의 ---
 
-def hex_to_pressure(hex_data_string):
+def hex_byte_codes(hex_bytes):
+    """
+    1~2자리 16진수 바이트 문자열 배열을 한 번에 uint8 값으로 변환합니다.
+    (값 배열, 유효 마스크)를 반환하며, 비어 있거나 16진수가 아닌 항목은 유효하지 않음으로 표시됩니다.
+    pyarrow가 있으면 Arrow 문자열 배열을 해시 조회(index_in)로, 없으면 Series를 dict 조회로 변환합니다.
+    """
+    if pc is not None:
+        positions = pc.index_in(hex_bytes, value_set=pa.array(HEX_BYTE_TOKENS))
+        valid = np.asarray(pc.is_valid(positions))
+        codes = HEX_BYTE_LUT[np.asarray(pc.fill_null(positions, 0))]
+    else:
+        values = hex_bytes.map(HEX_BYTE_VALUES)
+        valid = values.notna().to_numpy()
+        codes = values.fillna(0).to_numpy(dtype=np.uint8)
+
+    return codes, valid
+
+def decode_payload(data_hex, byte_indices):
+    """
+    'AA BB CC ...' 형식의 Data 컬럼에서 byte_indices(오름차순) 위치의 바이트만 정규식 한 번으로 잘라내
+    (행 수 x 위치 수) uint8 행렬로 디코딩합니다. 나머지 바이트는 분할/변환하지 않습니다.
+    (값 행렬, 유효 마스크 행렬)을 반환하며, DLC보다 짧거나 16진수가 아닌 바이트는 유효하지 않음으로 표시됩니다.
+    """
+    # 앞쪽 바이트는 건너뛰고 필요한 위치만 그룹으로 잡음. 뒤쪽 바이트는 없어도 앞쪽 위치는 매칭되도록 선택 그룹을 중첩
+    # (예: [1] -> ^\s*\S+(?:\s+(?P<b1>\S+))?)
+    groups = [f'(?P<b{j}>\\S+)' if j in byte_indices else r'\S+' for j in range(byte_indices[-1] + 1)]
+    pattern = ''
+    for group in reversed(groups[1:]):
+        pattern = rf'(?:\s+{group}{pattern})?'
+    pattern = rf'^\s*{groups[0]}{pattern}'
+    if pc is not None:
+        tokens = pc.extract_regex(pa.array(data_hex, type=pa.string(), from_pandas=True), pattern)
+        byte_columns = [pc.struct_field(tokens, [col]) for col in range(len(byte_indices))]
+    else:
+        tokens = data_hex.str.extract(pattern)
+        byte_columns = [tokens[col] for col in tokens.columns]
+
+    payload = np.zeros((len(data_hex), len(byte_indices)), dtype=np.uint8)
+    valid = np.zeros((len(data_hex), len(byte_indices)), dtype=bool)
+    for col, hex_bytes in enumerate(byte_columns):
+        payload[:, col], valid[:, col] = hex_byte_codes(hex_bytes)
+
+    return payload, valid
+
+def parse_time_seconds(time_series):
+    """
+    Time 문자열을 정규식 한 번으로 시/분/초로 나눠 초 단위 float 배열로 변환합니다.
+    오른쪽(초)부터 맞추므로 MM:SS와 H:MM:SS 행이 섞여 있어도 되며, 형식이 맞지 않는 행은 NaN입니다.
+    pyarrow가 있으면 Arrow 커널(extract_regex / cast)을, 없으면 Series.str.extract를 사용합니다.
+    """
+    if pc is not None:
+        parts = pc.extract_regex(pa.array(time_series, type=pa.string(), from_pandas=True), TIME_PATTERN)
+        matched = np.asarray(pc.is_valid(parts))
+        hours, minutes, seconds = (
+            np.asarray(pc.cast(pc.if_else(pc.equal(part, ''), '0', part), pa.float64())) # 생략된 시/분은 0
+            for part in (pc.struct_field(parts, [k]) for k in range(3))
+        )
+    else:
+        parts = time_series.str.extract(TIME_PATTERN)
+        matched = parts['seconds'].notna().to_numpy()
+        hours, minutes, seconds = (
+            pd.to_numeric(parts[col]).fillna(0.0).to_numpy(dtype=float)
+            for col in ['hours', 'minutes', 'seconds']
+        )
+
+    return np.where(matched, (hours * 60.0 + minutes) * 60.0 + seconds, np.nan)
+
+def downsample(x, y, x_range=None, target=MAX_PLOT_POINTS):
+    """
+    그리기 전에 X축 표시 범위만 잘라내고, 점 개수를 약 target개 이하로 줄입니다.
+    구간마다 최솟값/최댓값 지점을 남겨 압력 피크가 사라지지 않도록 합니다. (x는 오름차순이어야 함)
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+
+    if x_range is not None:
+        # 범위 바로 바깥의 점도 하나씩 포함해야 가장자리 선이 끊기지 않고, 점 사이로 확대해도 선이 그려짐 (xlim이 잘라냄)
+        lo = max(np.searchsorted(x, x_range[0], side='left') - 1, 0)
+        hi = min(np.searchsorted(x, x_range[1], side='right') + 1, len(x))
+        x, y = x[lo:hi], y[lo:hi]
+
+    n = len(x)
+    if n <= target:
+        return x, y
+
+    bucket = -(-n // (target // 2)) # 구간마다 2개(최소/최대)씩 남김
+    n_full = n // bucket * bucket
+    y_buckets = y[:n_full].reshape(-1, bucket)
+    offsets = np.arange(0, n_full, bucket)
+    keep = [
+        offsets + y_buckets.argmin(axis=1),
+        offsets + y_buckets.argmax(axis=1),
+        [0, n - 1] # 양 끝점 (범위 바깥 가장자리 점) 유지
+    ]
+    if n_full < n: # 나머지 점들도 하나의 구간으로 취급
+        tail = y[n_full:]
+        keep.append([n_full + tail.argmin(), n_full + tail.argmax()])
+    keep = np.unique(np.concatenate(keep))
+    return x[keep], y[keep]
+
+def x_range_slider(label, x_min, x_max, key):
+    """
+    미리 계산된 X축 범위(스칼라)만 받아 슬라이더를 만듭니다. 데이터 범위가 0이면 경고 후 전체 범위를 반환합니다.
+    """
+    if x_max > x_min:
+        return st.slider(
+            label,
+            float(x_min), float(x_max), 
+            (float(x_min), float(x_max)),
+            step=(x_max - x_min) / 100 or 0.01,
+            key=key
+        )
+    st.warning("X축 데이터를 사용할 수 없습니다. (데이터 범위 0)")
+    return (x_min, x_max)
+
+def get_line_figure(key, figsize, n_lines=1, as_collection=False):
     """
-    CAN 데이터 페이로드에서 Start Byte (1)의 값을 추출하여 0-200 bar 물리적 계수를 적용해 변환합니다.
+    Figure / Axes / 선 객체를 세션마다 한 번만 만들어 두고 재사용합니다.
+    슬라이더가 바뀌어 재실행될 때는 선 데이터와 축 범위만 갱신하면 됩니다.
+    as_collection=True이면 Line2D 목록 대신, 여러 선을 한 번에 그리는 LineCollection 하나를 반환합니다.
     """
+    state_key = f'figure_{key}'
+    if state_key not in st.session_state:
+        fig = Figure(figsize=figsize) # pyplot에 등록하지 않으므로 plt.close 불필요
+        ax = fig.subplots()
+        if as_collection:
+            lines = ax.add_collection(LineCollection([], linewidths=LINE_WIDTH))
+        else:
+            lines = [ax.plot([], [], linewidth=LINE_WIDTH)[0] for _ in range(n_lines)]
+        ax.set_xlabel('Time (sec)')
+        ax.set_ylabel('Pressure (bar)')
+        ax.grid(True)
+        st.session_state[state_key] = (fig, ax, lines)
+    return st.session_state[state_key]
+
+def sniff_delimiter(raw):
+    """
+    헤더 다음 첫 데이터 줄만 보고 구분자를 한 번에 정합니다. (디코딩 없이 bytes에서 개수만 셈)
+    Data 컬럼 안에도 공백이 있으므로, 컬럼 구분 개수(7개) 이상 나타나는 첫 후보를 우선순위대로 고릅니다.
+    """
+    lines = raw[:SNIFF_SAMPLE_SIZE].split(b'\n', HEADER_ROWS_TO_SKIP + 1)
+    first_line = lines[HEADER_ROWS_TO_SKIP] if len(lines) > HEADER_ROWS_TO_SKIP else b''
+    for sep in DELIMITER_CANDIDATES:
+        if first_line.count(sep.encode()) >= len(COLUMNS) - 1:
+            return sep
+    return ','
+
+def read_can_csv(raw, sep):
+    """
+    Time / ID / Data 컬럼만 읽고, 대상 CAN ID 행의 Time / Data 컬럼만 남겨 반환합니다.
+    pyarrow가 있으면 Arrow 파서를, 없거나 실패하면 pandas C 엔진을 사용합니다.
+    ID 컬럼은 사전 인코딩되므로, 문자열 정규화/비교는 고유 ID 값에만 하고 행 단위로는 정수 코드만 비교합니다.
+    """
+    if pac is not None:
+        try:
+            table = pac.read_csv(
+                io.BytesIO(raw),
+                read_options=pac.ReadOptions(skip_rows=HEADER_ROWS_TO_SKIP, column_names=COLUMNS, encoding='utf8'),
+                parse_options=pac.ParseOptions(delimiter=sep),
+                convert_options=pac.ConvertOptions(
+                    include_columns=USE_COLUMNS,
+                    column_types={
+                        TIME_COLUMN: pa.string(),
+                        CAN_ID_COLUMN: pa.dictionary(pa.int32(), pa.string()),
+                        DATA_COLUMN: pa.string()
+                    }
+                )
+            )
+            # Arrow 상태에서 필터링하여 버려질 행은 pandas로 변환하지 않음 (사전은 청크마다 다를 수 있음)
+            is_target = []
+            for chunk in table[CAN_ID_COLUMN].chunks:
+                ids = pc.utf8_upper(pc.utf8_trim_whitespace(chunk.dictionary))
+                target_codes = np.flatnonzero(pc.equal(ids, TARGET_CAN_ID).to_numpy(zero_copy_only=False))
+                is_target.append(pc.is_in(chunk.indices, value_set=pa.array(target_codes, type=chunk.indices.type)))
+            table = table.filter(pa.chunked_array(is_target, type=pa.bool_())).select([TIME_COLUMN, DATA_COLUMN])
+            return table.to_pandas()
+        except pa.ArrowException:
+            pass
+
+    df = pd.read_csv(
+        io.BytesIO(raw), 
+        sep=sep, 
+        encoding='utf-8',
+        skipinitialspace=True,
+        header=None,             
+        names=COLUMNS,           
+        usecols=USE_COLUMNS,
+        dtype=COLUMN_DTYPES,
+        skiprows=HEADER_ROWS_TO_SKIP, 
+        engine='c'          
+    )
+    can_ids = df[CAN_ID_COLUMN]
+    target_codes = np.flatnonzero(can_ids.cat.categories.str.strip().str.upper() == TARGET_CAN_ID)
+    is_target = can_ids.cat.codes.isin(target_codes)
+    return df.loc[is_target, [TIME_COLUMN, DATA_COLUMN]].reset_index(drop=True)
+
+def parquet_cache_path(raw):
+    """
+    파일 내용, 파싱/변환 설정, 캐시 형식 버전의 해시로 Parquet 캐시 경로를 만듭니다. (어느 하나라도 바뀌면 다른 경로가 됨)
+    """
+    settings = (
+        CACHE_FORMAT_VERSION,
+        HEADER_ROWS_TO_SKIP, COLUMNS, DELIMITER_CANDIDATES,  # 파싱 설정
+        TARGET_CAN_ID, START_BYTE_INDEX, PHYSICAL_FACTOR     # 변환 설정
+    )
+    digest = hashlib.sha1(raw)
+    digest.update(repr(settings).encode())
+    return PARQUET_CACHE_DIR / f'{digest.hexdigest()}.parquet'
+
+def make_signal(name, t, p, t_origin):
+    """
+    그래프에 필요한 값만 담은 결과 dict를 만듭니다. (t는 오름차순이어야 함)
+    """
+    return {
+        'name': name,
+        't': t,
+        'p': p,
+        't_min': float(t[0]),
+        't_max': float(t[-1]),
+        't_origin': t_origin
+    }
+
+def read_parquet_cache(path, name):
+    """
+    Parquet 캐시에서 결과를 읽습니다. CSV 파싱/변환을 모두 건너뜁니다.
+    """
+    table = pq.read_table(path)
     try:
-        byte_list = hex_data_string.strip().split()
-        data_byte_hex = byte_list[START_BYTE_INDEX] 
-        decimal_value = int(data_byte_hex, 16)
-        
-        # 물리적 최대 압력 (200 bar)에 맞춘 계수 적용 (0-255 -> 0-200 bar)
-        pressure = decimal_value * PHYSICAL_FACTOR
-        
-        return pressure
-        
-    except (IndexError, ValueError):
-        return np.nan 
+        os.utime(path) # 최근 사용 시각 갱신 (정리 시 기준, 실패해도 읽기에는 영향 없음)
+    except OSError:
+        pass
+    t_origin = float(table.schema.metadata[b't_origin'])
+    return make_signal(name, table['t'].to_numpy(), table['p'].to_numpy(), t_origin)
 
-@st.cache_data
-def load_and_process_data(uploaded_file, file_index):
+def write_parquet_cache(path, signal):
     """
-    업로드된 CSV 파일을 읽고 압력 데이터로 변환 및 필터링합니다.
+    결과를 Parquet 캐시로 저장합니다. 동시에 같은 파일을 처리해도 깨진 파일이 보이지 않도록 임시 파일에 쓴 뒤 교체합니다.
     """
-    st.info(f"파일 {file_index} ({uploaded_file.name}) 처리 중...")
-    
-    delimiters = [',', '\\s+', '\t', ';']
-    df = None
+    table = pa.table({'t': signal['t'], 'p': signal['p']})
+    table = table.replace_schema_metadata({'t_origin': str(signal['t_origin'])})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True) # 쓰다 만 임시 파일이 캐시 폴더에 남지 않도록 정리
+        raise
+
+def prune_parquet_cache():
+    """
+    오래 사용되지 않았거나 최대 개수를 넘는 Parquet 캐시를 최근 사용 순으로 정리합니다.
+    """
+    expire_before = time.time() - PARQUET_CACHE_MAX_AGE_DAYS * 86400
+    entries = sorted(
+        ((path.stat().st_mtime, path) for path in PARQUET_CACHE_DIR.glob('*.parquet')),
+        reverse=True
+    )
+    for rank, (mtime, path) in enumerate(entries):
+        if rank >= PARQUET_CACHE_MAX_FILES or mtime < expire_before:
+            path.unlink(missing_ok=True)
+
+# 업로드된 로그는 변하지 않으므로 앱 재시작 후에도 재사용되도록 디스크에 보존 (persist 사용 시 ttl은 무시됨)
+@st.cache_data(persist="disk", max_entries=32, show_spinner=False)
+def load_and_process_data(raw, name):
+    """
+    업로드된 CSV 파일 내용(bytes)을 읽고 압력 데이터로 변환 및 필터링합니다.
+    파일 내용으로 캐시되므로, UI 출력 대신 (결과 또는 None, [(메시지 수준, 메시지), ...])를 반환합니다.
+    결과는 그래프에 필요한 값만 담은 dict입니다: {'name', 't': 시간(sec, float32, 오름차순), 'p': 압력(bar, float32), 't_min', 't_max', 't_origin': 로그상 첫 프레임 시각(sec)}
+    같은 파일을 이전에 처리한 적이 있으면 Parquet 캐시에서 바로 읽습니다.
+    """
+    messages = []
     
-    # 1. 파일 로드 시도
-    for sep in delimiters:
+    # 0. Parquet 캐시 확인 (Streamlit 캐시가 비워져도 재파싱 없이 불러옴)
+    cache_path = parquet_cache_path(raw) if pq is not None else None
+    if cache_path is not None and cache_path.exists():
         try:
-            data = uploaded_file.getvalue().decode("utf-8")
-            df = pd.read_csv(
-                io.StringIO(data), 
-                sep=sep, 
-                header=None,             
-                names=COLUMNS,           
-                skiprows=HEADER_ROWS_TO_SKIP, 
-                engine='python'          
-            )
-            
-            if all(col in df.columns for col in [TIME_COLUMN, CAN_ID_COLUMN, DATA_COLUMN]):
-                st.success(f"파일 {file_index} ({uploaded_file.name})를 **'{sep}'** 구분자로 성공적으로 로드했습니다.")
-                break
-            else:
-                df = None
-                continue 
-        except Exception:
-            df = None
-            continue
+            return read_parquet_cache(cache_path, name), [('success', "이전에 처리한 결과(Parquet 캐시)를 불러왔습니다.")]
+        except (OSError, KeyError, ValueError, pa.ArrowException):
+            pass # 손상된 캐시는 무시하고 다시 처리
+    
+    # 1. 파일 로드 (구분자를 한 번만 추정한 뒤 단일 패스로 파싱하며 대상 CAN ID만 남김)
+    try:
+        sep = sniff_delimiter(raw)
+        df = read_can_csv(raw, sep)
+        messages.append(('success', f"**'{sep}'** 구분자로 성공적으로 로드했습니다."))
+    except Exception:
+        df = None
     
     if df is None:
-        st.error(f"⚠️ 파일 {file_index} 오류: 데이터를 로드할 수 없습니다. 파일 형식 및 인코딩을 확인하거나, 상단 헤더 줄 수({HEADER_ROWS_TO_SKIP}줄)를 확인하세요.")
-        return None
+        messages.append(('error', f"⚠️ 오류: 데이터를 로드할 수 없습니다. 파일 형식 및 인코딩을 확인하거나, 상단 헤더 줄 수({HEADER_ROWS_TO_SKIP}줄)를 확인하세요."))
+        return None, messages
 
     try:
-        df_filtered = df.copy()
-
-        # 2. 대상 CAN ID (0x295) 필터링 및 방어적 인덱싱
-        df_filtered.loc[:, CAN_ID_COLUMN] = df_filtered[CAN_ID_COLUMN].astype(str).str.strip().str.upper()
-        df_filtered = df_filtered[df_filtered[CAN_ID_COLUMN] == TARGET_CAN_ID].copy() 
-        df_filtered.reset_index(drop=True, inplace=True) 
-
-        if df_filtered.empty:
-            st.warning(f"파일 {file_index}: CAN ID '{TARGET_CAN_ID}'에 해당하는 데이터가 없어 그래프를 그릴 수 없습니다.")
-            return None
+        # 2. 대상 CAN ID (0x295) 확인 (필터링은 로드 단계에서 수행되어 df는 이미 Time / Data 두 컬럼뿐)
+        if df.empty:
+            messages.append(('warning', f"CAN ID '{TARGET_CAN_ID}'에 해당하는 데이터가 없어 그래프를 그릴 수 없습니다."))
+            return None, messages
         
-        # 3. 시간 변환 (Pandas 네이티브 로직)
-        time_series = df_filtered[TIME_COLUMN].astype(str).str.strip()
+        # 3. 시간 변환 ([시:]분:초.ms 문자열을 정규식 한 번으로 분해 후 산술 연산으로 초 단위 변환)
+        time_origin = 0.0
         
         try:
-            time_dt_str = time_series.str.replace(r'(\d+):(\d+\.?\d*)', r'00:\1:\2', regex=True)
-            time_dt = pd.to_datetime(time_dt_str, format='%H:%M:%S.%f', errors='coerce')
-            
-            time_delta = time_dt - time_dt.min()
-            df_filtered.loc[:, TIME_COLUMN] = time_delta.dt.total_seconds()
+            time_sec = parse_time_seconds(df[TIME_COLUMN])
+            time_origin = float(np.nanmin(time_sec)) # 파일 간 공통 시간 원점 정렬용으로 보관
+            time_sec -= time_origin
             
         except Exception as e:
-             st.error(f"⚠️ 파일 {file_index} 시간 변환 중 오류 발생: {e}. Time 컬럼 형식(분:초.ms) 확인 필요.")
-             df_filtered.loc[:, TIME_COLUMN] = np.nan 
+             messages.append(('error', f"⚠️ 시간 변환 중 오류 발생: {e}. Time 컬럼 형식(분:초.ms) 확인 필요."))
+             time_sec = np.full(len(df), np.nan)
 
-        # 4. 압력 계산
-        df_filtered.loc[:, DATA_COLUMN] = df_filtered[DATA_COLUMN].astype(str).str.strip()
-        df_filtered.loc[:, 'Pressure'] = df_filtered[DATA_COLUMN].apply(hex_to_pressure)
+        # 4. 압력 계산 (Start Byte만 디코딩한 뒤 0-255 -> 0-200 bar 변환표로 변환)
+        # 정규식이 앞뒤 공백을 무시하므로 별도의 strip 불필요. 신호가 늘어나면 바이트 위치만 추가하면 됨
+        payload, valid = decode_payload(df[DATA_COLUMN], [START_BYTE_INDEX])
+        pressure = np.where(valid[:, 0], PRESSURE_LUT[payload[:, 0]], np.nan)
         
-        # 5. NaN 값 제거
-        df_filtered.dropna(subset=['Pressure', TIME_COLUMN], inplace=True)
+        # 5. NaN 값 제거 (DataFrame 복사 없이 배열 마스크로 처리)
+        keep = ~(np.isnan(time_sec) | np.isnan(pressure))
+        t = time_sec[keep].astype(np.float32)
+        p = pressure[keep].astype(np.float32)
 
-        if df_filtered.empty:
-            st.error(f"파일 {file_index}: 데이터는 로드되었으나, **변환 후 유효한 데이터가 남아있지 않아** 그래프를 그릴 수 없습니다.")
-            return None
+        if len(t) == 0:
+            messages.append(('error', "데이터는 로드되었으나, **변환 후 유효한 데이터가 남아있지 않아** 그래프를 그릴 수 없습니다."))
+            return None, messages
             
-        return df_filtered
+        # 6. 시간순 정렬 (로그가 이미 시간순이면 생략) 후 X축 범위를 함께 저장
+        if np.any(np.diff(t) < 0):
+            order = np.argsort(t, kind='stable')
+            t, p = t[order], p[order]
+
+        signal = make_signal(name, t, p, time_origin)
+
+        # 7. Parquet 캐시 저장 (실패해도 결과 표시에는 영향 없음)
+        if cache_path is not None:
+            try:
+                write_parquet_cache(cache_path, signal)
+                prune_parquet_cache()
+            except (OSError, pa.ArrowException):
+                pass
+
+        return signal, messages
     except Exception as e:
-        st.error(f"⚠️ 파일 {file_index} 데이터 필터링/변환 중 오류 발생: {e}")
-        return None
+        messages.append(('error', f"⚠️ 데이터 필터링/변환 중 오류 발생: {e}"))
+        return None, messages
+
+# --- 탭별 그래프 (fragment: 위젯 변경 시 해당 탭만 재실행) ---
+
+@st.fragment
+def render_file_tab(data, i):
+    """
+    개별 파일 탭의 축 설정 슬라이더와 그래프를 그립니다.
+    """
+    t, p = data['t'], data['p']
+    cleaned_name = data['cleaned_name']
+    
+    st.subheader(f"📈 {cleaned_name} - CAN ID {TARGET_CAN_ID}") 
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        x_range = x_range_slider(f"File {i+1} X축 범위 (sec)", data['t_min'], data['t_max'], f'x_range_{i}')
+
+    with col2:
+        y_range = st.slider(
+            f"File {i+1} Y축 범위 (bar)",
+            0.0, MAX_PLOT_Y_BAR, # 🚨 [수정] 250.0 bar 적용
+            (0.0, MAX_PLOT_Y_BAR),
+            step=0.1,
+            key=f'y_range_{i}'
+        )
+    
+    if len(t) > 0:
+        fig, ax, (line,) = get_line_figure(f'tab_{i}', (10, 5))
+        
+        color = GRAPH_COLORS[i % len(GRAPH_COLORS)]
+        line.set_data(*downsample(t, p, x_range))
+        line.set_color(color)
+        
+        ax.set_title(cleaned_name) 
+        ax.set_xlim(x_range)
+        ax.set_ylim(y_range)
+        
+        st.pyplot(fig, clear_figure=False)
+
+@st.fragment
+def render_overlay_tab(all_dfs):
+    """
+    중첩 비교 탭의 파일 선택, 축 설정과 중첩 그래프를 그립니다.
+    """
+    st.header("비교 분석: 중첩 그래프")
+    
+    st.subheader("표시할 파일 선택")
+    
+    checkbox_states = {}
+    cols = st.columns(len(all_dfs))
+    
+    for i, data in enumerate(all_dfs):
+        with cols[i]:
+            is_checked = st.checkbox(
+                f"파일 {i+1}: {data['cleaned_name']}",
+                value=True, 
+                key=f'overlay_check_{i}'
+            )
+            checkbox_states[i] = is_checked
+
+    align_origin = st.checkbox(
+        "기록 시각 기준으로 정렬 (공통 시간 원점)",
+        value=False,
+        key='overlay_align_origin',
+        help="해제 시 각 파일의 첫 프레임을 0초로 맞추고, 선택 시 로그에 기록된 시각 차이를 유지합니다."
+    )
+    
+    # 그래프 범위 설정
+    if all_dfs:
+        
+        checked_indices = [i for i in range(len(all_dfs)) if checkbox_states[i]]
+        
+        # 파일별 시간 오프셋과 전체 X축 범위는 캐시된 스칼라 값만으로 계산
+        base_origin = min((all_dfs[i]['t_origin'] for i in checked_indices), default=0.0)
+        offsets = [data['t_origin'] - base_origin if align_origin else 0.0 for data in all_dfs]
+        max_overall_x = max((all_dfs[i]['t_max'] + offsets[i] for i in checked_indices), default=0.0)
+        min_overall_x = min((all_dfs[i]['t_min'] + offsets[i] for i in checked_indices), default=0.0)
+
+        col_a, col_b = st.columns(2)
+        with col_a:
+            overlay_x_range = x_range_slider("중첩 그래프 X축 범위 (sec)", min_overall_x, max_overall_x, 'overlay_x')
+
+        with col_b:
+            overlay_y_range = st.slider(
+                "중첩 그래프 Y축 범위 (bar)",
+                0.0, MAX_PLOT_Y_BAR, # 🚨 [수정] 250.0 bar 적용
+                (0.0, MAX_PLOT_Y_BAR),
+                step=0.1,
+                key='overlay_y'
+            )
+        
+        fig_overlay, ax_overlay, overlay_lines = get_line_figure('overlay', (12, 6), as_collection=True)
+        
+        # 선택된 파일의 선을 LineCollection 하나로 묶어 한 번에 그림 (범례는 색상별 대리 핸들 사용)
+        segments = []
+        colors = []
+        legend_handles = []
+        for i, data in enumerate(all_dfs):
+            if checkbox_states[i] and len(data['t']) > 0:
+                offset = offsets[i]
+                x_plot, y_plot = downsample(data['t'], data['p'], (overlay_x_range[0] - offset, overlay_x_range[1] - offset))
+                color = GRAPH_COLORS[i % len(GRAPH_COLORS)]
+                segments.append(np.column_stack([x_plot + offset, y_plot]))
+                colors.append(color)
+                legend_handles.append(Line2D([], [], color=color, linewidth=LINE_WIDTH, label=data['cleaned_name']))
+        
+        plotted_count = len(segments)
+        if plotted_count > 0:
+            overlay_lines.set_segments(segments)
+            overlay_lines.set_color(colors)
+            
+            ax_overlay.set_title(f'Overlayed Pressure vs. Time Comparison (CAN ID {TARGET_CAN_ID})')
+            ax_overlay.legend(handles=legend_handles)
+            
+            ax_overlay.set_xlim(overlay_x_range)
+            ax_overlay.set_ylim(overlay_y_range)
+            
+            st.pyplot(fig_overlay, clear_figure=False)
+        else:
+            st.warning("표시할 파일이 선택되지 않았습니다. 하나 이상의 파일을 선택해주세요.")
+    else:
+         st.info("처리된 데이터가 없어 중첩 그래프를 표시할 수 없습니다. CAN ID가 0x295인지 확인하세요.")
 
 # --- Streamlit 앱 메인 로직 ---
 
@@ -137,14 +558,20 @@ uploaded_files = st.file_uploader(
 if uploaded_files:
     files_to_process = uploaded_files[:3] 
     
+    # 파일별 처리는 서로 독립적이므로 병렬로 실행 (파싱은 C/Arrow 엔진에서 GIL을 해제)
+    with st.spinner(f"파일 {len(files_to_process)}개 처리 중..."):
+        with ThreadPoolExecutor(max_workers=len(files_to_process)) as executor:
+            results = list(executor.map(
+                lambda f: load_and_process_data(f.getvalue(), f.name),
+                files_to_process
+            ))
+    
     processed_data = {}
-    for i, file in enumerate(files_to_process):
-        df = load_and_process_data(file, i + 1)
-        if df is not None and not df.empty:
-            processed_data[i] = {
-                'df': df, 
-                'name': file.name
-            }
+    for i, (file, (signal, messages)) in enumerate(zip(files_to_process, results)):
+        for level, message in messages:
+            getattr(st, level)(f"파일 {i + 1} ({file.name}): {message}")
+        if signal is not None and len(signal['t']) > 0:
+            processed_data[i] = signal
 
     if processed_data:
         st.header("개별 그래프 및 축 설정")
@@ -155,7 +582,7 @@ if uploaded_files:
         for i, (idx, data) in enumerate(processed_data.items()):
             cleaned_name = data['name'].replace('.csv', '')
             tab_titles.append(f"Graph {i+1}: {cleaned_name}")
-            all_dfs.append({'df': data['df'], 'name': data['name'], 'cleaned_name': cleaned_name})
+            all_dfs.append({**data, 'cleaned_name': cleaned_name})
         
         tab_titles.append("중첩 비교")
         tabs = st.tabs(tab_titles)
@@ -163,145 +590,13 @@ if uploaded_files:
         
         # --- 개별 그래프 탭 및 설정 ---
         for i, data in enumerate(all_dfs):
-            df = data['df']
-            name = data['name']
-            cleaned_name = data['cleaned_name']
-            
             with tabs[i]:
-                st.subheader(f"📈 {cleaned_name} - CAN ID {TARGET_CAN_ID}") 
-                
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    max_x = df[TIME_COLUMN].max()
-                    min_x_default = df[TIME_COLUMN].min()
-                    
-                    if max_x > min_x_default:
-                        x_range = st.slider(
-                            f"File {i+1} X축 범위 (sec)",
-                            float(min_x_default), float(max_x), 
-                            (float(min_x_default), float(max_x)),
-                            step=(max_x - min_x_default) / 100 or 0.01,
-                            key=f'x_range_{i}'
-                        )
-                    else:
-                        st.warning("X축 데이터를 사용할 수 없습니다. (데이터 범위 0)")
-                        x_range = (min_x_default, max_x)
-
-                with col2:
-                    y_range = st.slider(
-                        f"File {i+1} Y축 범위 (bar)",
-                        0.0, MAX_PLOT_Y_BAR, # 🚨 [수정] 250.0 bar 적용
-                        (0.0, MAX_PLOT_Y_BAR),
-                        step=0.1,
-                        key=f'y_range_{i}'
-                    )
-                
-                if not df.empty:
-                    fig, ax = plt.subplots(figsize=(10, 5))
-                    
-                    color = GRAPH_COLORS[i % len(GRAPH_COLORS)]
-                    ax.plot(df[TIME_COLUMN], df['Pressure'], 
-                            linewidth=LINE_WIDTH, 
-                            color=color)
-                    
-                    ax.set_title(cleaned_name) 
-                    ax.set_xlabel('Time (sec)')
-                    ax.set_ylabel('Pressure (bar)') 
-                    ax.grid(True)
-                    
-                    ax.set_xlim(x_range)
-                    ax.set_ylim(y_range)
-                    
-                    st.pyplot(fig)
-                    plt.close(fig)
+                render_file_tab(data, i)
 
         # --- 중첩 그래프 섹션 (마지막 탭) ---
         
         with tabs[-1]:
-            st.header("비교 분석: 중첩 그래프")
-            
-            st.subheader("표시할 파일 선택")
-            
-            checkbox_states = {}
-            cols = st.columns(len(all_dfs))
-            
-            for i, data in enumerate(all_dfs):
-                with cols[i]:
-                    is_checked = st.checkbox(
-                        f"파일 {i+1}: {data['cleaned_name']}",
-                        value=True, 
-                        key=f'overlay_check_{i}'
-                    )
-                    checkbox_states[i] = is_checked
-
-            
-            # 그래프 범위 설정
-            if all_dfs:
-                
-                checked_dfs = [data['df'] for i, data in enumerate(all_dfs) if checkbox_states[i]]
-                
-                try:
-                    max_overall_x = max(d[TIME_COLUMN].max() for d in checked_dfs) if checked_dfs else 0.0
-                    min_overall_x = min(d[TIME_COLUMN].min() for d in checked_dfs) if checked_dfs else 0.0
-                except ValueError: 
-                    max_overall_x = 0.0
-                    min_overall_x = 0.0
-
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    if max_overall_x > min_overall_x:
-                        overlay_x_range = st.slider(
-                            "중첩 그래프 X축 범위 (sec)",
-                            float(min_overall_x), float(max_overall_x), 
-                            (float(min_overall_x), float(max_overall_x)),
-                            step=(max_overall_x - min_overall_x) / 100 or 0.01,
-                            key='overlay_x'
-                        )
-                    else:
-                        st.warning("X축 데이터를 사용할 수 없습니다. (데이터 범위 0)")
-                        overlay_x_range = (min_overall_x, max_overall_x)
-
-                with col_b:
-                    overlay_y_range = st.slider(
-                        "중첩 그래프 Y축 범위 (bar)",
-                        0.0, MAX_PLOT_Y_BAR, # 🚨 [수정] 250.0 bar 적용
-                        (0.0, MAX_PLOT_Y_BAR),
-                        step=0.1,
-                        key='overlay_y'
-                    )
-                
-                fig_overlay, ax_overlay = plt.subplots(figsize=(12, 6))
-                
-                plotted_count = 0
-                for i, data in enumerate(all_dfs):
-                    if checkbox_states[i]:
-                        df = data['df']
-                        cleaned_name = data['cleaned_name']
-                        color = GRAPH_COLORS[i % len(GRAPH_COLORS)]
-                        if not df.empty:
-                             ax_overlay.plot(df[TIME_COLUMN], df['Pressure'], 
-                                             label=cleaned_name, 
-                                             linewidth=LINE_WIDTH, 
-                                             color=color)
-                             plotted_count += 1
-                
-                if plotted_count > 0:
-                    ax_overlay.set_title(f'Overlayed Pressure vs. Time Comparison (CAN ID {TARGET_CAN_ID})')
-                    ax_overlay.set_xlabel('Time (sec)')
-                    ax_overlay.set_ylabel('Pressure (bar)')
-                    ax_overlay.grid(True)
-                    ax_overlay.legend()
-                    
-                    ax_overlay.set_xlim(overlay_x_range)
-                    ax_overlay.set_ylim(overlay_y_range)
-                    
-                    st.pyplot(fig_overlay)
-                    plt.close(fig_overlay)
-                else:
-                    st.warning("표시할 파일이 선택되지 않았습니다. 하나 이상의 파일을 선택해주세요.")
-            else:
-                 st.info("처리된 데이터가 없어 중첩 그래프를 표시할 수 없습니다. CAN ID가 0x295인지 확인하세요.")
+            render_overlay_tab(all_dfs)
 
 else:
     st.info("⬆️ 분석을 시작하려면 CSV 파일을 업로드해주세요.")
\ No newline at end of file